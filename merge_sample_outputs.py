@@ -1,28 +1,37 @@
 import argparse
-import csv
 import json
 import os
+import shutil
 from typing import Dict, List, Optional
 
+from parse_paf_and_classify import write_json
 
-def read_tsv_header(path: str) -> List[str]:
-    with open(path, "r", newline="") as f:
-        r = csv.reader(f, delimiter="\t")
-        return next(r)
 
+def read_tsv_header(path: str) -> bytes:
+    with open(path, "rb") as f:
+        header = f.readline()
+    if not header.rstrip(b"\r\n"):
+        raise ValueError(f"Missing header in {path}")
+    return header
 
-def append_tsv_rows(src_path: str, dst_fh, *, header: List[str], wrote_header: bool) -> bool:
-    with open(src_path, "r", newline="") as f:
-        r = csv.reader(f, delimiter="\t")
-        src_header = next(r)
-        if src_header != header:
+
+def append_tsv_rows(src_path: str, dst_fh, *, header: bytes, wrote_header: bool) -> bool:
+    with open(src_path, "rb") as f:
+        src_header = f.readline()
+        if not src_header.rstrip(b"\r\n"):
+            raise ValueError(f"Missing header in {src_path}")
+        if src_header.rstrip(b"\r\n") != header.rstrip(b"\r\n"):
             raise ValueError(f"Header mismatch in {src_path}")
-        w = csv.writer(dst_fh, delimiter="\t")
         if not wrote_header:
-            w.writerow(header)
+            dst_fh.write(header if header.endswith(b"\n") else header + b"\r\n")
             wrote_header = True
-        for row in r:
-            w.writerow(row)
+        shutil.copyfileobj(f, dst_fh, 1 << 20)
+        # A truncated file (e.g. a killed driver job) may lack its final newline;
+        # terminate the row so it is not glued to the next sample's first row.
+        if f.tell() > len(src_header):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                dst_fh.write(b"\r\n")
     return wrote_header
 
 
@@ -41,7 +50,8 @@ def main() -> None:
     if args.samples.strip():
         samples = [x.strip() for x in args.samples.split(",") if x.strip()]
     else:
-        samples = sorted([x for x in os.listdir(type_dir) if os.path.isdir(os.path.join(type_dir, x))])
+        with os.scandir(type_dir) as it:
+            samples = sorted(e.name for e in it if e.is_dir())
 
     region_paths: List[str] = []
     qc_paths: List[str] = []
@@ -58,18 +68,17 @@ def main() -> None:
 
     header = read_tsv_header(region_paths[0])
     combined_region_path = os.path.join(type_dir, "all_samples_region_validation.tsv")
-    with open(combined_region_path, "w", newline="") as out_f:
+    with open(combined_region_path, "wb") as out_f:
         wrote = False
         for path in region_paths:
             wrote = append_tsv_rows(path, out_f, header=header, wrote_header=wrote)
 
     qc_all: List[Dict[str, object]] = []
     for path in qc_paths:
-        with open(path, "r") as f:
+        with open(path, "r", encoding="utf-8") as f:
             qc_all.append(json.load(f))
     qc_all_path = os.path.join(type_dir, "qc_all_samples.json")
-    with open(qc_all_path, "w") as f:
-        json.dump(qc_all, f, indent=2, sort_keys=True)
+    write_json(qc_all_path, qc_all)
 
 
 if __name__ == "__main__":
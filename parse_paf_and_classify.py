@@ -1,14 +1,20 @@
 import argparse
 import csv
-import glob
 import json
+import operator
 import os
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-@dataclass(frozen=True)
-class RegionMeta:
+
+class RegionMeta(NamedTuple):
     sample: str
     region_id: str
     category: str
@@ -25,21 +31,42 @@ class RegionMeta:
     total_flank: int
 
 
-@dataclass
-class AlignmentRecord:
-    qname: str
-    qlen: int
-    qstart: int
-    qend: int
-    strand: str
-    tname: str
-    tlen: int
-    tstart: int
-    tend: int
-    nmatch: int
-    alen: int
-    mapq: int
-    tp: Optional[str]
+# (qname, region_id, tlen, tstart, tend, alen, mapq, tp) -- only the PAF columns used downstream.
+PafRow = Tuple[str, str, int, int, int, int, int, Optional[str]]
+
+# ((tspan, alen, mapq), tlen, tstart, tend, tp) -- best alignment kept per (qname, region_id).
+BestAlignment = Tuple[Tuple[int, int, int], int, int, int, Optional[str]]
+
+# Output TSVs keep the "\r\n" terminator csv.writer has always produced, so files stay byte-identical.
+TSV_EOL = "\r\n"
+TSV_BUFFER_SIZE = 8 << 20
+
+SHORT_REGION_MAX_EXTR_LENGTH = 15000
+
+REGION_HEADER = [
+    "sample",
+    "type",
+    "region_id",
+    "validated_level",
+    "extr_chrom",
+    "extr_start",
+    "extr_end",
+    "extr_length",
+    "left_flank",
+    "right_flank",
+    "insert_length",
+    "tlen",
+    "n_full_span_reads",
+    "n_single_junction_reads",
+    "max_target_cov",
+    "max_insert_overlap",
+    "n_read_region_pairs",
+    "orig_chrom",
+    "orig_start",
+    "orig_end",
+    "orig_length",
+    "category",
+]
 
 
 def parse_region_id_from_tname(tname: str) -> str:
@@ -50,6 +77,10 @@ def parse_sample_from_region_id(region_id: str) -> str:
     return region_id.split("|", 1)[0]
 
 
+def sample_from_paf_path(paf_path: str) -> str:
+    return os.path.basename(paf_path).split("_", 1)[0]
+
+
 def overlap_len(a0: int, a1: int, b0: int, b1: int) -> int:
     lo = max(a0, b0)
     hi = min(a1, b1)
@@ -59,8 +90,9 @@ def overlap_len(a0: int, a1: int, b0: int, b1: int) -> int:
 def load_position_mapping(csv_path: str) -> Dict[Tuple[str, str], RegionMeta]:
     mapping: Dict[Tuple[str, str], RegionMeta] = {}
     with open(csv_path, "r", newline="") as f:
-        reader = csv.DictReader(f)
-        required = {
+        reader = csv.reader(f)
+        fieldnames = next(reader, [])
+        required = [
             "sample",
             "region_id",
             "category",
@@ -75,130 +107,187 @@ def load_position_mapping(csv_path: str) -> Dict[Tuple[str, str], RegionMeta]:
             "left_flank",
             "right_flank",
             "total_flank",
-        }
-        missing = required - set(reader.fieldnames or [])
+        ]
+        missing = set(required) - set(fieldnames)
         if missing:
             raise ValueError(f"Missing columns in {csv_path}: {sorted(missing)}")
+        get_required = operator.itemgetter(*(fieldnames.index(name) for name in required))
         for row in reader:
-            sample = row["sample"]
-            region_id = row["region_id"]
+            if not row:
+                continue
+            (
+                sample,
+                region_id,
+                category,
+                orig_chrom,
+                orig_start,
+                orig_end,
+                orig_length,
+                extr_chrom,
+                extr_start,
+                extr_end,
+                extr_length,
+                left_flank,
+                right_flank,
+                total_flank,
+            ) = get_required(row)
+            sample = sys.intern(sample)
+            region_id = sys.intern(region_id)
             mapping[(sample, region_id)] = RegionMeta(
-                sample=sample,
-                region_id=region_id,
-                category=row["category"],
-                orig_chrom=row["orig_chrom"],
-                orig_start=int(row["orig_start"]),
-                orig_end=int(row["orig_end"]),
-                orig_length=int(row["orig_length"]),
-                extr_chrom=row["extr_chrom"],
-                extr_start=int(row["extr_start"]),
-                extr_end=int(row["extr_end"]),
-                extr_length=int(row["extr_length"]),
-                left_flank=int(row["left_flank"]),
-                right_flank=int(row["right_flank"]),
-                total_flank=int(row["total_flank"]),
+                sample,
+                region_id,
+                category,
+                orig_chrom,
+                int(orig_start),
+                int(orig_end),
+                int(orig_length),
+                extr_chrom,
+                int(extr_start),
+                int(extr_end),
+                int(extr_length),
+                int(left_flank),
+                int(right_flank),
+                int(total_flank),
             )
     return mapping
 
 
-def parse_tp_tag(fields: List[str]) -> Optional[str]:
-    for x in fields[12:]:
-        if x.startswith("tp:A:") and len(x) >= 6:
-            return x[5:]
-    return None
+_TP_TAG_RE = re.compile(rb"(?:^|\t)tp:A:([^\t]+)")
+
+
+def parse_tp_tag(tags: bytes) -> Optional[str]:
+    m = _TP_TAG_RE.search(tags)
+    return m.group(1).decode() if m else None
 
 
-def iter_paf_records(paf_path: str) -> Iterable[AlignmentRecord]:
-    with open(paf_path, "r") as f:
+def iter_paf_records(paf_path: str) -> Iterable[PafRow]:
+    # Work on raw bytes and only decode the two name columns; the optional
+    # SAM-like tags stay as one unsplit field for parse_tp_tag to scan.
+    # Many reads hit the same target, so region_id is parsed once per distinct tname.
+    region_id_by_tname: Dict[bytes, str] = {}
+    with open(paf_path, "rb", buffering=1 << 20) as f:
         for line in f:
-            if not line or line.startswith("#"):
+            if line.startswith(b"#"):
                 continue
-            parts = line.rstrip("\n").split("\t")
+            parts = line.rstrip(b"\r\n").split(b"\t", 12)
             if len(parts) < 12:
                 continue
-            tp = parse_tp_tag(parts)
-            yield AlignmentRecord(
-                qname=parts[0],
-                qlen=int(parts[1]),
-                qstart=int(parts[2]),
-                qend=int(parts[3]),
-                strand=parts[4],
-                tname=parts[5],
-                tlen=int(parts[6]),
-                tstart=int(parts[7]),
-                tend=int(parts[8]),
-                nmatch=int(parts[9]),
-                alen=int(parts[10]),
-                mapq=int(parts[11]),
-                tp=tp,
+            region_id = region_id_by_tname.get(parts[5])
+            if region_id is None:
+                region_id = sys.intern(parse_region_id_from_tname(parts[5].decode()))
+                region_id_by_tname[parts[5]] = region_id
+            yield (
+                parts[0].decode(),
+                region_id,
+                int(parts[6]),
+                int(parts[7]),
+                int(parts[8]),
+                int(parts[10]),
+                int(parts[11]),
+                parse_tp_tag(parts[12]) if len(parts) > 12 else None,
             )
 
 
-def choose_better_alignment(a: AlignmentRecord, b: AlignmentRecord) -> AlignmentRecord:
-    a_span = a.tend - a.tstart
-    b_span = b.tend - b.tstart
-    if b_span != a_span:
-        return b if b_span > a_span else a
-    if b.alen != a.alen:
-        return b if b.alen > a.alen else a
-    if b.mapq != a.mapq:
-        return b if b.mapq > a.mapq else a
-    return a
-
-
-def compute_evidence(
-    aln: AlignmentRecord,
-    meta: RegionMeta,
+def make_evidence_kernel(
     *,
     edge_window: int,
     min_target_cov: float,
     min_overlap_bp: int,
     insert_min_overlap_for_single_junction: int,
-) -> Tuple[float, int, bool, bool]:
-    tlen = aln.tlen
-    tstart = aln.tstart
-    tend = aln.tend
-    target_cov = (tend - tstart) / tlen if tlen > 0 else 0.0
-
-    left_flank = max(0, min(meta.left_flank, tlen))
-    right_flank = max(0, min(meta.right_flank, tlen))
-    insert_start = left_flank
-    insert_end = max(insert_start, tlen - right_flank)
-    right_start = insert_end
-
-    left_ok = left_flank == 0 or overlap_len(tstart, tend, 0, left_flank) >= min_overlap_bp
-    insert_ok = overlap_len(tstart, tend, insert_start, insert_end) >= min_overlap_bp
-    right_ok = right_flank == 0 or overlap_len(tstart, tend, right_start, tlen) >= min_overlap_bp
-
-    full_span = (
-        target_cov >= min_target_cov
-        and tstart <= edge_window
-        and tend >= tlen - edge_window
-        and left_ok
-        and insert_ok
-        and right_ok
-    )
+) -> Callable[[int, int, int, int, int], Tuple[float, int, bool, bool]]:
+    # The thresholds are fixed for a whole run, so bind them as closure variables once;
+    # the per-pair call then takes only positional ints. Clamping uses plain comparisons
+    # because builtin min()/max() calls dominate the cost of this function otherwise.
+    def compute_evidence(
+        tlen: int,
+        tstart: int,
+        tend: int,
+        left_flank: int,
+        right_flank: int,
+    ) -> Tuple[float, int, bool, bool]:
+        target_cov = (tend - tstart) / tlen if tlen > 0 else 0.0
+
+        if left_flank > tlen:
+            left_flank = tlen
+        if left_flank < 0:
+            left_flank = 0
+        if right_flank > tlen:
+            right_flank = tlen
+        if right_flank < 0:
+            right_flank = 0
+        insert_start = left_flank
+        insert_end = tlen - right_flank
+        if insert_end < insert_start:
+            insert_end = insert_start
+
+        overlap_hi = tend if tend < insert_end else insert_end
+        overlap_lo = tstart if tstart > insert_start else insert_start
+        insert_overlap = overlap_hi - overlap_lo if overlap_hi > overlap_lo else 0
+
+        full_span = (
+            target_cov >= min_target_cov
+            and tstart <= edge_window
+            and tend >= tlen - edge_window
+            and insert_overlap >= min_overlap_bp
+            and (left_flank == 0 or overlap_len(tstart, tend, 0, left_flank) >= min_overlap_bp)
+            and (right_flank == 0 or overlap_len(tstart, tend, insert_end, tlen) >= min_overlap_bp)
+        )
+
+        single_junction = insert_overlap >= insert_min_overlap_for_single_junction and (
+            tstart < insert_start < tend or tstart < insert_end < tend
+        )
+
+        return target_cov, insert_overlap, full_span, single_junction
+
+    return compute_evidence
 
-    insert_overlap = overlap_len(tstart, tend, insert_start, insert_end)
-    left_junction_supported = tstart < insert_start and tend > insert_start
-    right_junction_supported = tstart < insert_end and tend > insert_end
-    single_junction = insert_overlap >= insert_min_overlap_for_single_junction and (
-        left_junction_supported or right_junction_supported
-    )
 
-    return target_cov, insert_overlap, full_span, single_junction
+def validated_level(extr_length: int, n_full_span: int, n_single_junction: int, min_support_reads: int) -> str:
+    # Short regions need min_support_reads full spans; longer ones need a single full span,
+    # or fall back to min_support_reads single-junction reads.
+    is_long = extr_length > SHORT_REGION_MAX_EXTR_LENGTH
+    if n_full_span >= (1 if is_long else min_support_reads):
+        return "Validated_Full_Span"
+    if is_long and n_single_junction >= min_support_reads:
+        return "Validated_Single_Junction"
+    return "Not_Validated"
 
 
 def safe_mkdir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
-def write_tsv(path: str, header: List[str], rows: Iterable[List[str]]) -> None:
-    with open(path, "w", newline="") as f:
-        w = csv.writer(f, delimiter="\t")
-        w.writerow(header)
-        for row in rows:
-            w.writerow(row)
+def write_tsv(path: str, header: List[str], lines: Iterable[str]) -> None:
+    with open(path, "w", newline="", buffering=TSV_BUFFER_SIZE) as f:
+        f.write("\t".join(header) + TSV_EOL)
+        f.writelines(lines)
+
+
+def write_json(path: str, obj: object) -> None:
+    # Also used by merge_sample_outputs.py. The bytes always match json.dump(indent=2, sort_keys=True):
+    # orjson is only a fast path for the all-ASCII case, because json escapes non-ASCII (and the lone
+    # surrogates of undecodable file names, which orjson rejects) as \uXXXX. QC payloads hold only
+    # strings, ints and lists, where both serializers agree.
+    data = None
+    if orjson is not None:
+        try:
+            data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+        except TypeError:
+            data = None
+        if data is not None and not data.isascii():
+            data = None
+    if data is None:
+        data = json.dumps(obj, indent=2, sort_keys=True).encode("ascii")
+    # Write beside the target and rename so a failure never leaves a truncated JSON file.
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 def classify_one_paf(
@@ -216,17 +305,15 @@ def classify_one_paf(
     insert_min_overlap_for_single_junction: int,
     min_support_reads: int,
     write_read_details: bool,
-) -> Tuple[List[List[str]], Dict[str, object]]:
-    base = os.path.basename(paf_path)
-    sample = base.split("_", 1)[0]
+) -> Tuple[List[str], Dict[str, object]]:
+    sample = sample_from_paf_path(paf_path)
 
     sample_dir = os.path.join(out_dir, type_label, sample)
     safe_mkdir(sample_dir)
 
     regions = regions_by_sample.get(sample, [])
-    meta_by_region_id = {m.region_id: m for m in regions}
 
-    best_by_pair: Dict[Tuple[str, str], AlignmentRecord] = {}
+    best_by_pair: Dict[Tuple[str, str], BestAlignment] = {}
     qc = {
         "paf_path": paf_path,
         "sample": sample,
@@ -241,25 +328,29 @@ def classify_one_paf(
         "tlen_vs_extr_length_max_abs_diff": 0,
     }
 
-    for aln in iter_paf_records(paf_path):
-        qc["total_records"] = int(qc["total_records"]) + 1
-        if aln.mapq < mapq_min:
+    total_records = 0
+    kept_records = 0
+    for qname, region_id, tlen, tstart, tend, alen, mapq, tp in iter_paf_records(paf_path):
+        total_records += 1
+        if mapq < mapq_min:
             continue
-        if aln.tp is not None and aln.tp not in include_tp:
+        if tp is not None and tp not in include_tp:
             continue
-        region_id = parse_region_id_from_tname(aln.tname)
-        key = (aln.qname, region_id)
+        key = (qname, region_id)
+        # Prefer the longer target span, then alen, then mapq; ties keep the first record seen.
+        rank = (tend - tstart, alen, mapq)
         existing = best_by_pair.get(key)
-        if existing is None:
-            best_by_pair[key] = aln
-        else:
-            best_by_pair[key] = choose_better_alignment(existing, aln)
-        qc["kept_records"] = int(qc["kept_records"]) + 1
+        if existing is None or rank > existing[0]:
+            best_by_pair[key] = (rank, tlen, tstart, tend, tp)
+        kept_records += 1
 
+    qc["total_records"] = total_records
+    qc["kept_records"] = kept_records
     qc["unique_pairs"] = len(best_by_pair)
 
-    region_full_span_reads: Dict[str, Set[str]] = {}
-    region_single_junction_reads: Dict[str, Set[str]] = {}
+    # best_by_pair holds one entry per (qname, region_id), so per-region counts are already distinct reads.
+    region_n_full_span: Dict[str, int] = {}
+    region_n_single_junction: Dict[str, int] = {}
     region_max_target_cov: Dict[str, float] = {}
     region_max_insert_overlap: Dict[str, int] = {}
     region_n_pairs: Dict[str, int] = {}
@@ -283,144 +374,141 @@ def classify_one_paf(
 
     read_details_path = os.path.join(sample_dir, "read_details.tsv")
     read_details_fh = None
-    read_details_writer = None
     if write_read_details:
-        read_details_fh = open(read_details_path, "w", newline="")
-        read_details_writer = csv.writer(read_details_fh, delimiter="\t")
-        read_details_writer.writerow(read_detail_header)
+        read_details_fh = open(read_details_path, "w", newline="", buffering=TSV_BUFFER_SIZE)
+        read_details_fh.write("\t".join(read_detail_header) + TSV_EOL)
+
+    compute_evidence = make_evidence_kernel(
+        edge_window=edge_window,
+        min_target_cov=min_target_cov,
+        min_overlap_bp=min_overlap_bp,
+        insert_min_overlap_for_single_junction=insert_min_overlap_for_single_junction,
+    )
 
-    for (qname, region_id), aln in best_by_pair.items():
-        meta = meta_by_region_id.get(region_id)
+    missing_region_meta = 0
+    tlen_mismatch_count = 0
+    tlen_max_abs_diff = 0
+    for (qname, region_id), ((_, _, mapq), tlen, tstart, tend, tp) in best_by_pair.items():
+        meta = mapping.get((sample, region_id))
         if meta is None:
-            qc["missing_region_meta"] = int(qc["missing_region_meta"]) + 1
+            missing_region_meta += 1
             continue
 
-        diff = abs(aln.tlen - meta.extr_length)
+        diff = abs(tlen - meta.extr_length)
         if diff != 0:
-            qc["tlen_vs_extr_length_mismatch_count"] = int(qc["tlen_vs_extr_length_mismatch_count"]) + 1
-            qc["tlen_vs_extr_length_max_abs_diff"] = max(int(qc["tlen_vs_extr_length_max_abs_diff"]), diff)
+            tlen_mismatch_count += 1
+            if diff > tlen_max_abs_diff:
+                tlen_max_abs_diff = diff
 
         target_cov, insert_overlap, full_span, single_junction = compute_evidence(
-            aln,
-            meta,
-            edge_window=edge_window,
-            min_target_cov=min_target_cov,
-            min_overlap_bp=min_overlap_bp,
-            insert_min_overlap_for_single_junction=insert_min_overlap_for_single_junction,
+            tlen, tstart, tend, meta.left_flank, meta.right_flank
         )
 
         region_n_pairs[region_id] = region_n_pairs.get(region_id, 0) + 1
         region_max_target_cov[region_id] = max(region_max_target_cov.get(region_id, 0.0), target_cov)
         region_max_insert_overlap[region_id] = max(region_max_insert_overlap.get(region_id, 0), insert_overlap)
-        region_tlen_seen.setdefault(region_id, aln.tlen)
+        region_tlen_seen.setdefault(region_id, tlen)
 
         if full_span:
-            region_full_span_reads.setdefault(region_id, set()).add(qname)
+            region_n_full_span[region_id] = region_n_full_span.get(region_id, 0) + 1
         if single_junction:
-            region_single_junction_reads.setdefault(region_id, set()).add(qname)
-
-        if read_details_writer is not None:
-            read_details_writer.writerow(
-                [
-                    sample,
-                    type_label,
-                    region_id,
-                    qname,
-                    str(aln.tlen),
-                    str(aln.tstart),
-                    str(aln.tend),
-                    f"{target_cov:.6f}",
-                    str(insert_overlap),
-                    "1" if full_span else "0",
-                    "1" if single_junction else "0",
-                    str(aln.mapq),
-                    aln.tp or "",
-                ]
+            region_n_single_junction[region_id] = region_n_single_junction.get(region_id, 0) + 1
+
+        if read_details_fh is not None:
+            read_details_fh.write(
+                f"{sample}\t{type_label}\t{region_id}\t{qname}\t{tlen}\t{tstart}\t{tend}\t{target_cov:.6f}"
+                f"\t{insert_overlap}\t{int(full_span)}\t{int(single_junction)}\t{mapq}\t{tp or ''}{TSV_EOL}"
             )
 
     if read_details_fh is not None:
         read_details_fh.close()
-    with open(os.path.join(sample_dir, "qc.json"), "w") as f:
-        json.dump(qc, f, indent=2, sort_keys=True)
+    qc["missing_region_meta"] = missing_region_meta
+    qc["tlen_vs_extr_length_mismatch_count"] = tlen_mismatch_count
+    qc["tlen_vs_extr_length_max_abs_diff"] = tlen_max_abs_diff
+    write_json(os.path.join(sample_dir, "qc.json"), qc)
 
-    region_rows: List[List[str]] = []
-    region_header = [
-        "sample",
-        "type",
-        "region_id",
-        "validated_level",
-        "extr_chrom",
-        "extr_start",
-        "extr_end",
-        "extr_length",
-        "left_flank",
-        "right_flank",
-        "insert_length",
-        "tlen",
-        "n_full_span_reads",
-        "n_single_junction_reads",
-        "max_target_cov",
-        "max_insert_overlap",
-        "n_read_region_pairs",
-        "orig_chrom",
-        "orig_start",
-        "orig_end",
-        "orig_length",
-        "category",
-    ]
+    region_rows: List[str] = []
 
     for meta in regions:
         region_id = meta.region_id
         extr_len = meta.extr_length
         insert_len = max(0, extr_len - meta.left_flank - meta.right_flank)
 
-        full_span_reads = region_full_span_reads.get(region_id, set())
-        single_junction_reads = region_single_junction_reads.get(region_id, set())
+        n_full_span = region_n_full_span.get(region_id, 0)
+        n_single_junction = region_n_single_junction.get(region_id, 0)
 
-        tlen = str(region_tlen_seen.get(region_id, ""))
+        tlen = region_tlen_seen.get(region_id, "")
 
-        validated = "Not_Validated"
-        if extr_len <= 15000:
-            if len(full_span_reads) >= min_support_reads:
-                validated = "Validated_Full_Span"
-        else:
-            if len(full_span_reads) >= 1:
-                validated = "Validated_Full_Span"
-            elif len(single_junction_reads) >= min_support_reads:
-                validated = "Validated_Single_Junction"
+        validated = validated_level(extr_len, n_full_span, n_single_junction, min_support_reads)
 
         region_rows.append(
-            [
-                sample,
-                type_label,
-                region_id,
-                validated,
-                meta.extr_chrom,
-                str(meta.extr_start),
-                str(meta.extr_end),
-                str(meta.extr_length),
-                str(meta.left_flank),
-                str(meta.right_flank),
-                str(insert_len),
-                tlen,
-                str(len(full_span_reads)),
-                str(len(single_junction_reads)),
-                f"{region_max_target_cov.get(region_id, 0.0):.6f}",
-                str(region_max_insert_overlap.get(region_id, 0)),
-                str(region_n_pairs.get(region_id, 0)),
-                meta.orig_chrom,
-                str(meta.orig_start),
-                str(meta.orig_end),
-                str(meta.orig_length),
-                meta.category,
-            ]
+            f"{sample}\t{type_label}\t{region_id}\t{validated}"
+            f"\t{meta.extr_chrom}\t{meta.extr_start}\t{meta.extr_end}\t{meta.extr_length}"
+            f"\t{meta.left_flank}\t{meta.right_flank}\t{insert_len}\t{tlen}"
+            f"\t{n_full_span}\t{n_single_junction}\t{region_max_target_cov.get(region_id, 0.0):.6f}"
+            f"\t{region_max_insert_overlap.get(region_id, 0)}\t{region_n_pairs.get(region_id, 0)}"
+            f"\t{meta.orig_chrom}\t{meta.orig_start}\t{meta.orig_end}\t{meta.orig_length}\t{meta.category}{TSV_EOL}"
         )
 
-    write_tsv(os.path.join(sample_dir, "region_validation.tsv"), region_header, region_rows)
+    write_tsv(os.path.join(sample_dir, "region_validation.tsv"), REGION_HEADER, region_rows)
 
     return region_rows, qc
 
 
+def positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {n}")
+    return n
+
+
+def available_cpu_count() -> int:
+    # Respect cgroup/SLURM CPU affinity where the platform exposes it; cpu_count() reports every core.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+_worker_classify_kwargs: Dict[str, object] = {}
+
+
+def _init_classify_worker(classify_kwargs: Dict[str, object]) -> None:
+    global _worker_classify_kwargs
+    _worker_classify_kwargs = classify_kwargs
+
+
+def _classify_sample_in_worker(paf_paths: List[str]) -> List[Tuple[List[str], Dict[str, object]]]:
+    return [classify_one_paf(paf_path, **_worker_classify_kwargs) for paf_path in paf_paths]
+
+
+def iter_classified_pafs(
+    paf_paths: List[str],
+    *,
+    jobs: int,
+    classify_kwargs: Dict[str, object],
+) -> Iterator[Tuple[List[str], Dict[str, object]]]:
+    # PAFs sharing a sample prefix write to the same sample directory, so each sample's files
+    # form one task and run serially in sorted order, later files overwriting earlier ones.
+    paf_paths_by_sample: Dict[str, List[str]] = {}
+    for paf_path in paf_paths:
+        paf_paths_by_sample.setdefault(sample_from_paf_path(paf_path), []).append(paf_path)
+    jobs = min(jobs, len(paf_paths_by_sample))
+    if jobs <= 1:
+        for paf_path in paf_paths:
+            yield classify_one_paf(paf_path, **classify_kwargs)
+        return
+    # The shared mapping is handed to each worker once rather than pickled per task. Same-prefix
+    # paths are contiguous in sorted paf_paths, so yielding per-sample results in submission
+    # order keeps the paf_paths order and the combined output stable.
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_classify_worker,
+        initargs=(classify_kwargs,),
+    ) as executor:
+        for results in executor.map(_classify_sample_in_worker, paf_paths_by_sample.values()):
+            yield from results
+
+
 def main() -> None:
     p = argparse.ArgumentParser()
     p.add_argument("--type", required=True, choices=["numt", "nupt"])
@@ -437,6 +525,12 @@ def main() -> None:
     p.add_argument("--min-overlap-bp", type=int, default=1)
     p.add_argument("--insert-min-overlap", type=int, default=10000)
     p.add_argument("--min-support-reads", type=int, default=2)
+    p.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=available_cpu_count(),
+        help="Number of samples to classify in parallel worker processes (default: CPUs available to this process)",
+    )
     args = p.parse_args()
 
     mapping = load_position_mapping(args.position_mapping_csv)
@@ -446,70 +540,67 @@ def main() -> None:
     include_tp = {x.strip() for x in args.include_tp.split(",") if x.strip()}
 
     safe_mkdir(args.out_dir)
-    paf_paths = sorted(glob.glob(os.path.join(args.paf_dir, f"*_{args.type}_mapped.paf")))
+    paf_suffix = f"_{args.type}_mapped.paf"
+    with os.scandir(args.paf_dir) as it:
+        paf_paths = sorted(
+            e.path for e in it if e.name.endswith(paf_suffix) and not e.name.startswith(".") and e.is_file()
+        )
     if not paf_paths:
         raise FileNotFoundError(f"No PAF files matched in {args.paf_dir} for type {args.type}")
     if args.samples.strip():
         keep = {x.strip() for x in args.samples.split(",") if x.strip()}
-        paf_paths = [p for p in paf_paths if os.path.basename(p).split("_", 1)[0] in keep]
+        paf_paths = [p for p in paf_paths if sample_from_paf_path(p) in keep]
         if not paf_paths:
             raise FileNotFoundError(f"No PAF files matched requested samples: {sorted(keep)}")
 
-    all_region_rows: List[List[str]] = []
-    qc_rows: List[Dict[str, object]] = []
+    classify_kwargs: Dict[str, object] = dict(
+        mapping=mapping,
+        regions_by_sample=regions_by_sample,
+        type_label=args.type,
+        out_dir=args.out_dir,
+        mapq_min=args.mapq_min,
+        include_tp=include_tp,
+        edge_window=args.edge_window,
+        min_target_cov=args.min_target_cov,
+        min_overlap_bp=args.min_overlap_bp,
+        insert_min_overlap_for_single_junction=args.insert_min_overlap,
+        min_support_reads=args.min_support_reads,
+        write_read_details=args.write_read_details,
+    )
 
-    for paf_path in paf_paths:
-        region_rows, qc = classify_one_paf(
-            paf_path,
-            mapping=mapping,
-            regions_by_sample=regions_by_sample,
-            type_label=args.type,
-            out_dir=args.out_dir,
-            mapq_min=args.mapq_min,
-            include_tp=include_tp,
-            edge_window=args.edge_window,
-            min_target_cov=args.min_target_cov,
-            min_overlap_bp=args.min_overlap_bp,
-            insert_min_overlap_for_single_junction=args.insert_min_overlap,
-            min_support_reads=args.min_support_reads,
-            write_read_details=args.write_read_details,
-        )
-        all_region_rows.extend(region_rows)
-        qc_rows.append(qc)
+    qc_rows: List[Dict[str, object]] = []
 
     combined_dir = os.path.join(args.out_dir, args.type)
     safe_mkdir(combined_dir)
+    combined_region_path = os.path.join(combined_dir, "all_samples_region_validation.tsv")
+    # Append each sample's rows to the combined TSV as it is yielded instead of collecting all
+    # samples first. With --jobs 1 only one sample's rows are held at a time. With --jobs > 1 results
+    # are yielded in paf_paths order, so samples that finish before a slower earlier one wait in
+    # memory until it is written; in the worst case that is every remaining sample. The trade-off
+    # keeps the combined output sorted. Rows go to a temporary file that only replaces the combined
+    # TSV once every sample succeeded, and it is only created once there is a row to write.
+    combined_tmp_path = combined_region_path + ".tmp"
+    combined_fh = None
+    try:
+        for region_rows, qc in iter_classified_pafs(paf_paths, jobs=args.jobs, classify_kwargs=classify_kwargs):
+            qc_rows.append(qc)
+            if args.no_combined or not region_rows:
+                continue
+            if combined_fh is None:
+                combined_fh = open(combined_tmp_path, "w", newline="", buffering=TSV_BUFFER_SIZE)
+                combined_fh.write("\t".join(REGION_HEADER) + TSV_EOL)
+            combined_fh.writelines(region_rows)
+    except BaseException:
+        if combined_fh is not None:
+            combined_fh.close()
+            os.remove(combined_tmp_path)
+        raise
+    if combined_fh is not None:
+        combined_fh.close()
+        os.replace(combined_tmp_path, combined_region_path)
+
     if not args.no_combined:
-        combined_region_path = os.path.join(combined_dir, "all_samples_region_validation.tsv")
-        if all_region_rows:
-            header = [
-                "sample",
-                "type",
-                "region_id",
-                "validated_level",
-                "extr_chrom",
-                "extr_start",
-                "extr_end",
-                "extr_length",
-                "left_flank",
-                "right_flank",
-                "insert_length",
-                "tlen",
-                "n_full_span_reads",
-                "n_single_junction_reads",
-                "max_target_cov",
-                "max_insert_overlap",
-                "n_read_region_pairs",
-                "orig_chrom",
-                "orig_start",
-                "orig_end",
-                "orig_length",
-                "category",
-            ]
-            write_tsv(combined_region_path, header, all_region_rows)
-
-        with open(os.path.join(combined_dir, "qc_all_samples.json"), "w") as f:
-            json.dump(qc_rows, f, indent=2, sort_keys=True)
+        write_json(os.path.join(combined_dir, "qc_all_samples.json"), qc_rows)
 
 
 if __name__ == "__main__":